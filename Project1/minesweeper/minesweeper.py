@@ -1,6 +1,14 @@
 import itertools
+import math
 import random
-import copy
+import time
+
+from collections import deque
+
+import numpy as np
+
+# Seconds the AI may spend working out its best guess
+GUESS_TIME_LIMIT = 0.5
 
 
 class Minesweeper():
@@ -13,23 +21,21 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
-
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Add mines by sampling distinct cells, seeded from `random`
+        # so that seeding the random module still fixes the board
+        rng = np.random.default_rng(random.getrandbits(64))
+        positions = rng.choice(height * width, size=mines, replace=False)
+        self.board = np.zeros((height, width), dtype=bool)
+        self.board.flat[positions] = True
+        rows, columns = np.nonzero(self.board)
+        self.mines = set(zip(rows.tolist(), columns.tolist()))
+
+        # Count the mines around every cell at once, by summing each
+        # 3x3 window of the zero-padded board and removing the centre
+        padded = np.pad(self.board, 1).astype(np.uint8)
+        windows = np.lib.stride_tricks.sliding_window_view(padded, (3, 3))
+        self.counts = windows.sum(axis=(2, 3)) - self.board
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -42,7 +48,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.board[i, j]:
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -51,7 +57,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i, j])
 
     def nearby_mines(self, cell):
         """
@@ -59,24 +65,27 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        i, j = cell
+        return int(self.counts[i, j])
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+    def reveal(self, cell):
+        """
+        Returns the set of cells uncovered by clicking on a safe `cell`.
+        If the cell has no nearby mines, its neighbours are uncovered
+        too, spreading through every connected cell with no nearby mines.
+        """
+        revealed = {cell}
+        frontier = [cell]
+        while frontier:
+            i, j = frontier.pop()
+            if self.counts[i, j] != 0:
+                continue
+            for k in range(max(i - 1, 0), min(i + 2, self.height)):
+                for l in range(max(j - 1, 0), min(j + 2, self.width)):
+                    if (k, l) not in revealed:
+                        revealed.add((k, l))
+                        frontier.append((k, l))
+        return revealed
 
     def won(self):
         """
@@ -90,15 +99,21 @@ class Sentence():
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+
+    Sentences are immutable, so they can be hashed and kept in sets;
+    marking a cell returns a new sentence instead of changing this one.
     """
 
     def __init__(self, cells, count):
-        self.cells = set(cells)
+        self.cells = frozenset(cells)
         self.count = count
 
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
+    def __hash__(self):
+        return hash((self.cells, self.count))
+
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
@@ -120,24 +135,21 @@ class Sentence():
 
     def mark_mine(self, cell):
         """
-        Updates internal knowledge representation given the fact that
+        Returns the sentence that remains given the fact that
         a cell is known to be a mine.
         """
         if cell in self.cells:
-            self.cells.remove(cell)
-            self.count = self.count - 1
-            return True
-        return False
+            return Sentence(self.cells - {cell}, self.count - 1)
+        return self
 
     def mark_safe(self, cell):
         """
-        Updates internal knowledge representation given the fact that
+        Returns the sentence that remains given the fact that
         a cell is known to be safe.
         """
         if cell in self.cells:
-            self.cells.remove(cell)
-            return True
-        return False
+            return Sentence(self.cells - {cell}, self.count)
+        return self
 
 
 class MinesweeperAI():
@@ -145,12 +157,15 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Total number of mines on the board, if known
+        self.total_mines = mines
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -158,65 +173,133 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Set of sentences about the game known to be true
+        self.knowledge = set()
+
+        # Maps each cell to the set of sentences that mention it
+        self.index = dict()
+
+        # Sentences that changed and still need to be checked for inferences
+        self.pending = deque()
+
+        # Seconds spent updating knowledge for each move
+        self.inference_times = []
 
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
+        if cell in self.mines:
+            return
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        for sentence in self.index.pop(cell, set()):
+            self.forget(sentence)
+            self.learn(sentence.mark_mine(cell))
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        if cell in self.safes:
+            return
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        for sentence in self.index.pop(cell, set()):
+            self.forget(sentence)
+            self.learn(sentence.mark_safe(cell))
 
     def create_sentence(self, cell, count):
+        """
+        Returns a sentence about the undetermined neighbours of `cell`,
+        with `count` reduced by the neighbours already known to be mines.
+        """
         cells = []
-        x = [1,1,1,0,-1,-1,-1,0]
-        y = [1,0,-1,-1,-1,0,1,1]
-
-        for i in range(len(x)):
-            if cell[0]+y[i]>=0 and cell[0]+y[i]<self.height and cell[1]+x[i]>=0 and cell[1]+x[i]<self.width:
-                cells.append((cell[0]+y[i],cell[1]+x[i]))
-
-        return Sentence(cells,count)
-
-
-    def add_sentence(self,sent,sent2):
-        cells = []
+        for i in range(cell[0] - 1, cell[0] + 2):
+            for j in range(cell[1] - 1, cell[1] + 2):
+                if (i, j) == cell:
+                    continue
+                if 0 <= i < self.height and 0 <= j < self.width:
+                    if (i, j) in self.mines:
+                        count -= 1
+                    elif (i, j) not in self.safes:
+                        cells.append((i, j))
 
-        for cell in sent.cells:
-            if cell not in sent2.cells:
-                cells.append(cell)
+        return Sentence(cells, count)
 
+    def add_sentence(self, sent, sent2):
+        """
+        Returns the sentence `sent - sent2`, given that
+        the cells of `sent2` are a subset of the cells of `sent`.
+        """
+        cells = sent.cells - sent2.cells
         count = sent.count - sent2.count
 
-        return Sentence(cells,count)
-
-    def clean_knowledge(self):
-
-        for sent in self.knowledge:
-            if len(sent.cells) == 0:
-                self.knowledge.remove(sent)
+        return Sentence(cells, count)
 
-        clean = []
-        for sent in self.knowledge:
-            if sent not in clean:
-                clean.append(sent)
-
-        self.knowledge = clean
+    def learn(self, sentence):
+        """
+        Adds `sentence` to the knowledge base, unless it is empty
+        or already known, and queues it for inference.
+        """
+        if len(sentence.cells) == 0 or sentence in self.knowledge:
+            return False
+        self.knowledge.add(sentence)
+        for cell in sentence.cells:
+            self.index.setdefault(cell, set()).add(sentence)
+        self.pending.append(sentence)
         return True
 
+    def forget(self, sentence):
+        """
+        Removes `sentence` from the knowledge base.
+        """
+        self.knowledge.discard(sentence)
+        for cell in sentence.cells:
+            sentences = self.index.get(cell)
+            if sentences is not None:
+                sentences.discard(sentence)
+                if not sentences:
+                    del self.index[cell]
+
+    def related(self, sentence):
+        """
+        Returns the set of other sentences sharing a cell with `sentence`.
+        """
+        related = set()
+        for cell in sentence.cells:
+            related.update(self.index.get(cell, ()))
+        related.discard(sentence)
+        return related
+
+    def infer(self):
+        """
+        Draws conclusions from the pending sentences until nothing changes.
 
+        A pending sentence either determines all of its cells, which are
+        then marked (queueing every sentence mentioning them), or is
+        compared with the sentences it shares cells with; whenever one
+        is a subset of the other, their difference is learned.
+        """
+        while self.pending:
+            sentence = self.pending.popleft()
+            if sentence not in self.knowledge:
+                continue
+
+            mines = sentence.known_mines()
+            safes = sentence.known_safes()
+            if mines or safes:
+                for cell in mines:
+                    self.mark_mine(cell)
+                for cell in safes:
+                    self.mark_safe(cell)
+                continue
+
+            for other in self.related(sentence):
+                if sentence.cells < other.cells:
+                    self.learn(self.add_sentence(other, sentence))
+                elif other.cells < sentence.cells:
+                    self.learn(self.add_sentence(sentence, other))
 
     def add_knowledge(self, cell, count):
         """
@@ -233,31 +316,15 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
-        self.mark_safe(cell)
-        self.moves_made.add(cell)
-
-        self.knowledge.append(self.create_sentence(cell,count))
-
-        self.clean_knowledge()
-
-        sentences = copy.deepcopy(self.knowledge)
-        for sent in sentences:
-            for sent2 in sentences:
-                if sent != sent2:
-                    if sent2.cells.issubset(sent.cells):
-                        self.knowledge.append(self.add_sentence(sent,sent2))
+        start = time.perf_counter()
 
+        self.moves_made.add(cell)
+        self.mark_safe(cell)
 
-        for sent in self.knowledge:
-            cells1 = list(sent.known_mines())
-            cells2 = list(sent.known_safes())
-            
-            for c in cells1:
-                self.mark_mine(c)
-            for c in cells2:
-                self.mark_safe(c)
+        self.learn(self.create_sentence(cell, count))
+        self.infer()
 
-        
+        self.inference_times.append(time.perf_counter() - start)
         return True
 
     def make_safe_move(self):
@@ -294,4 +361,266 @@ class MinesweeperAI():
                 return cell
 
         return None
-        
+
+    def make_guess_move(self, time_limit=GUESS_TIME_LIMIT):
+        """
+        Returns a known safe move if there is one. Otherwise returns the
+        move least likely to be a mine, among cells that:
+            1) have not already been chosen, and
+            2) are not known to be mines
+
+        Mine probabilities are computed exactly from the knowledge base
+        when that takes less than `time_limit` seconds; otherwise they
+        are estimated from each sentence on its own. Which of the two is
+        used depends on how fast the machine is, unless `time_limit` is
+        None, in which case they are always computed exactly.
+        """
+        move = self.make_safe_move()
+        if move is not None:
+            return move
+
+        # Known safes are all played by now, so every cell left
+        # is either in a sentence or in the unconstrained interior
+        unknown = set(
+            (i, j)
+            for i in range(self.height)
+            for j in range(self.width)
+            if (i, j) not in self.safes and (i, j) not in self.mines
+        )
+        if not unknown:
+            return None
+
+        deadline = None
+        if time_limit is not None:
+            deadline = time.perf_counter() + time_limit
+        try:
+            probabilities = self.mine_probabilities(unknown, deadline)
+        except TimeoutError:
+            probabilities = self.estimate_probabilities(unknown)
+
+        lowest = min(probabilities.values())
+        best = [cell for cell in unknown if probabilities[cell] == lowest]
+        return random.choice(sorted(best))
+
+    def frontier_components(self):
+        """
+        Splits the knowledge base into independent components.
+        Returns a list of (cells, sentences) pairs, where no cell
+        of one component appears in a sentence of another.
+        """
+        components = []
+        seen = set()
+        for sentence in self.knowledge:
+            if sentence in seen:
+                continue
+
+            # Collect every sentence reachable through shared cells
+            seen.add(sentence)
+            cells = []
+            sentences = []
+            frontier = deque([sentence])
+            visited = set()
+            while frontier:
+                current = frontier.popleft()
+                sentences.append(current)
+                for cell in current.cells:
+                    if cell in visited:
+                        continue
+                    visited.add(cell)
+                    cells.append(cell)
+                    for other in self.index[cell]:
+                        if other not in seen:
+                            seen.add(other)
+                            frontier.append(other)
+            components.append((cells, sentences))
+        return components
+
+    def mine_probabilities(self, unknown, deadline):
+        """
+        Returns a dictionary mapping each cell in `unknown` to the
+        probability that it is a mine, assuming every mine layout
+        consistent with the knowledge base is equally likely.
+
+        If the total number of mines is not known, each component of
+        the frontier is treated on its own and cells outside every
+        sentence are given probability 0.5.
+
+        Raises TimeoutError once `deadline` has passed, if it is not None.
+        """
+        components = []
+        interior = set(unknown)
+        for cells, sentences in self.frontier_components():
+            table = count_configurations(cells, sentences, deadline)
+            components.append((cells, table))
+            interior.difference_update(cells)
+
+        probabilities = dict()
+        if self.total_mines is None:
+            for cells, table in components:
+                total = sum(ways for ways, _ in table.values())
+                for n, cell in enumerate(cells):
+                    mine_ways = sum(vector[n] for _, vector in table.values())
+                    probabilities[cell] = mine_ways / total
+            for cell in interior:
+                probabilities[cell] = 0.5
+            return probabilities
+
+        # Weight each way of splitting the remaining mines between the
+        # components by the number of ways to place the rest in the interior
+        remaining = self.total_mines - len(self.mines)
+        size = len(interior)
+        weights = [
+            {k: ways for k, (ways, _) in table.items()}
+            for _, table in components
+        ]
+        everything = convolve_all(weights)
+        total = sum(
+            ways * choose(size, remaining - k)
+            for k, ways in everything.items()
+        )
+        if total == 0:
+            return self.estimate_probabilities(unknown)
+
+        for n, (cells, table) in enumerate(components):
+            others = convolve_all(weights[:n] + weights[n + 1:])
+            for k, (_, vector) in table.items():
+                rest = sum(
+                    ways * choose(size, remaining - k - j)
+                    for j, ways in others.items()
+                )
+                for m, cell in enumerate(cells):
+                    probabilities[cell] = (
+                        probabilities.get(cell, 0) + vector[m] * rest
+                    )
+            for cell in cells:
+                probabilities[cell] = probabilities[cell] / total
+
+        interior_ways = sum(
+            ways * choose(size - 1, remaining - k - 1)
+            for k, ways in everything.items()
+        )
+        for cell in interior:
+            probabilities[cell] = interior_ways / total
+
+        return probabilities
+
+    def estimate_probabilities(self, unknown):
+        """
+        Returns a quick estimate of the probability that each cell in
+        `unknown` is a mine, using the most pessimistic sentence about
+        each cell and the average mine density elsewhere.
+        """
+        if self.total_mines is None:
+            density = 0.5
+        else:
+            density = (self.total_mines - len(self.mines)) / len(unknown)
+
+        probabilities = dict()
+        for sentence in self.knowledge:
+            p = sentence.count / len(sentence.cells)
+            for cell in sentence.cells:
+                probabilities[cell] = max(probabilities.get(cell, 0), p)
+        for cell in unknown:
+            if cell not in probabilities:
+                probabilities[cell] = density
+        return probabilities
+
+
+def choose(n, k):
+    """
+    Returns the number of ways to choose `k` items from `n`,
+    or 0 if that is impossible.
+    """
+    if k < 0 or k > n:
+        return 0
+    return math.comb(n, k)
+
+
+def convolve_all(distributions):
+    """
+    Given dictionaries mapping a mine count to a number of ways,
+    returns the dictionary for the total mine count across all of them.
+    """
+    result = {0: 1}
+    for distribution in distributions:
+        combined = dict()
+        for a, x in result.items():
+            for b, y in distribution.items():
+                combined[a + b] = combined.get(a + b, 0) + x * y
+        result = combined
+    return result
+
+
+def count_configurations(cells, sentences, deadline):
+    """
+    Counts the mine layouts over `cells` that satisfy every sentence.
+
+    Returns a dictionary mapping each possible number of mines k to a
+    pair (ways, vector), where `ways` is the number of layouts with k
+    mines and vector[n] is how many of them put a mine on cells[n].
+
+    Cells are assigned one at a time; the layouts of the remaining
+    cells only depend on the counts still owed by sentences that are
+    partly assigned, so results are memoised on those counts.
+
+    Raises TimeoutError once `deadline` has passed, if it is not None.
+    """
+    position = {cell: n for n, cell in enumerate(cells)}
+    owed = [sentence.count for sentence in sentences]
+    unassigned = [len(sentence.cells) for sentence in sentences]
+
+    # Sentences that mention each cell, and sentences that are
+    # partly assigned when each cell is reached
+    touches = [[] for _ in cells]
+    open_at = [[] for _ in range(len(cells) + 1)]
+    for s, sentence in enumerate(sentences):
+        indices = [position[cell] for cell in sentence.cells]
+        for n in indices:
+            touches[n].append(s)
+        for n in range(min(indices) + 1, max(indices) + 1):
+            open_at[n].append(s)
+
+    memo = dict()
+
+    def solve(n):
+        if n == len(cells):
+            return {0: (1, [])}
+        key = (n, tuple(owed[s] for s in open_at[n]))
+        if key in memo:
+            return memo[key]
+        if deadline is not None and time.perf_counter() > deadline:
+            raise TimeoutError
+
+        result = dict()
+        for mine in (0, 1):
+
+            # Every sentence must still be satisfiable by its other cells
+            if any(
+                owed[s] - mine < 0 or owed[s] - mine > unassigned[s] - 1
+                for s in touches[n]
+            ):
+                continue
+
+            for s in touches[n]:
+                owed[s] -= mine
+                unassigned[s] -= 1
+            rest = solve(n + 1)
+            for s in touches[n]:
+                owed[s] += mine
+                unassigned[s] += 1
+
+            for k, (ways, vector) in rest.items():
+                vector = [ways * mine] + vector
+                if k + mine in result:
+                    total, other = result[k + mine]
+                    result[k + mine] = (
+                        total + ways,
+                        [a + b for a, b in zip(other, vector)]
+                    )
+                else:
+                    result[k + mine] = (ways, vector)
+
+        memo[key] = result
+        return result
+
+    return solve(0)
@@ -0,0 +1,137 @@
+import argparse
+import random
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import GUESS_TIME_LIMIT, Minesweeper, MinesweeperAI
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play Minesweeper games with the AI, without a display."
+    )
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--density", type=float, default=0.125,
+                        help="fraction of cells that are mines")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes")
+    parser.add_argument("--exact", action="store_true",
+                        help="always work out guesses exactly, so results "
+                             "do not depend on the speed of the machine")
+    args = parser.parse_args()
+
+    if args.games < 1:
+        parser.error("games must be at least 1")
+
+    mines = round(args.height * args.width * args.density)
+    if not 0 < mines < args.height * args.width:
+        parser.error("density must leave at least one mine and one safe cell")
+
+    start = time.perf_counter()
+    results = simulate(
+        args.games, args.height, args.width, mines,
+        seed=args.seed, workers=args.workers,
+        time_limit=None if args.exact else GUESS_TIME_LIMIT
+    )
+    elapsed = time.perf_counter() - start
+
+    report(results, elapsed)
+
+
+def play_game(seed, height, width, mines, time_limit=GUESS_TIME_LIMIT):
+    """
+    Play one game with the AI and return a dictionary with:
+        - `won`: whether every safe cell was revealed
+        - `moves`: how many cells were revealed, including those
+          uncovered by the flood fill around cells with no nearby mines
+        - `inference_times`: seconds the AI spent on each move, choosing
+          it and then learning from every cell it revealed
+
+    Guesses are worked out exactly within `time_limit` seconds, or
+    estimated after that; see `MinesweeperAI.make_guess_move`.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, mines=mines)
+
+    won = False
+    times = []
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_guess_move(time_limit)
+            if move is None:
+                won = True
+                break
+        if game.is_mine(move):
+            break
+        for cell in game.reveal(move):
+            if cell not in ai.moves_made:
+                ai.add_knowledge(cell, game.nearby_mines(cell))
+        times.append(time.perf_counter() - start)
+
+    return {
+        "won": won,
+        "moves": len(ai.moves_made),
+        "inference_times": times
+    }
+
+
+def simulate(games, height, width, mines, seed=0, workers=None,
+             time_limit=GUESS_TIME_LIMIT):
+    """
+    Play `games` games seeded with `seed`, `seed + 1`, ... across
+    a pool of worker processes, and return their results in order.
+
+    Each game seeds the random module itself, so the number of workers
+    does not change the results. With a `time_limit` on guesses,
+    though, a slow or busy machine may estimate guesses that a faster
+    one works out exactly; pass None for results that are the same on
+    every run.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                play_game, seed + n, height, width, mines, time_limit
+            )
+            for n in range(games)
+        ]
+        return [future.result() for future in futures]
+
+
+def percentile(values, fraction):
+    """
+    Return the value below which `fraction` of sorted `values` lie.
+    """
+    index = min(len(values) - 1, int(fraction * len(values)))
+    return values[index]
+
+
+def report(results, elapsed):
+    """
+    Print the win rate, throughput and inference time distribution.
+    """
+    wins = sum(result["won"] for result in results)
+    moves = sum(result["moves"] for result in results)
+    times = sorted(
+        t for result in results for t in result["inference_times"]
+    )
+
+    print(f"Games: {len(results)}")
+    print(f"Win rate: {wins / len(results):.2%}")
+    print(f"Cells revealed: {moves} ({moves / elapsed:.0f} cells/sec)")
+    if times:
+        print("Inference time per move (ms):")
+        for label, fraction in [("50%", 0.5), ("90%", 0.9), ("99%", 0.99)]:
+            print(f"  {label}: {percentile(times, fraction) * 1000:.3f}")
+        print(f"  max: {times[-1] * 1000:.3f}")
+
+
+if __name__ == "__main__":
+    main()
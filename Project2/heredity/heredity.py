@@ -1,7 +1,16 @@
 import csv
 import itertools
+import json
+import os
 import sys
-from pomegranate import *
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from inference import Factor, marginals
+from model import compile_model
 
 PROBS = {
 
@@ -37,22 +46,124 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Number of assignments evaluated at once by `batch_marginals`
+BATCH_SIZE = 1 << 16
+
+# Default sample budget of the sampling methods, samples drawn by
+# likelihood weighting between checks of the standard error, and the
+# number of parallel Gibbs chains and sweeps discarded from each
+SAMPLES = 100000
+SAMPLE_BATCH = 10000
+CHAINS = 100
+BURN_IN = 100
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python heredity.py data.csv|directory [method] [workers]")
+    method = sys.argv[2] if len(sys.argv) >= 3 else "exact"
+    if method not in METHODS and method not in SAMPLERS:
+        methods = ", ".join(list(METHODS) + list(SAMPLERS))
+        sys.exit(f"Method must be one of: {methods}")
+
+    # Given a directory, print one line of JSON per family as each
+    # finishes, computing them in `workers` processes
+    if os.path.isdir(sys.argv[1]):
+        workers = None
+        if len(sys.argv) == 4:
+            if not sys.argv[3].isdigit() or int(sys.argv[3]) < 1:
+                sys.exit("Workers must be a positive integer")
+            workers = int(sys.argv[3])
+        for result in process_directory(sys.argv[1], method, workers):
+            print(json.dumps(result), flush=True)
+        return
+    if len(sys.argv) == 4:
+        sys.exit("Workers can only be given with a directory")
+
     people = load_data(sys.argv[1])
 
+    diagnostics = None
+    if method in SAMPLERS:
+        probabilities, diagnostics = SAMPLERS[method](people)
+    else:
+        probabilities = METHODS[method](people)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+    if diagnostics is not None:
+        print("Diagnostics:")
+        for key, value in diagnostics.items():
+            if isinstance(value, float):
+                value = f"{value:.4g}"
+            print(f"  {key}: {value}")
+
+
+def process_family(filename, method, spec=None):
+    """
+    Load the family in `filename` and compute its distributions with
+    `method` under the model `spec`. Return a dictionary with the file
+    name, the distributions, any sampling diagnostics and the seconds taken.
+
+    If the family cannot be loaded or computed, the dictionary holds
+    the error instead of the distributions, so that one bad file does
+    not stop the others in `process_directory`.
+    """
+    start = time.perf_counter()
+    result = {"family": os.path.basename(filename)}
+    try:
+        people = load_data(filename)
+        if method in SAMPLERS:
+            result["probabilities"], result["diagnostics"] = SAMPLERS[method](
+                people, spec=spec
+            )
+        else:
+            result["probabilities"] = METHODS[method](people, spec=spec)
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {error}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def process_directory(directory, method, workers=None, spec=None):
+    """
+    Compute the distributions of every family CSV in `directory` in a
+    pool of `workers` processes, yielding each result of
+    `process_family` as soon as it is ready.
+    """
+    filenames = sorted(
+        os.path.join(directory, filename)
+        for filename in os.listdir(directory)
+        if filename.endswith(".csv")
+    )
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(process_family, filename, method, spec)
+            for filename in filenames
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def enumerate_marginals(people, spec=None):
+    """
+    Return the gene and trait distribution of each person, computed by
+    summing the joint probability of every possible assignment.
+    """
+    model = tables(spec)
+
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
-            "gene": {
-                2: 0,
-                1: 0,
-                0: 0
-            },
+            "gene": {label: 0 for label in model.index},
             "trait": {
                 True: 0,
                 False: 0
@@ -61,38 +172,320 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+    # Loop over every assignment of genes, with unknown traits summed out
+    totals = [[0] * len(model) for person in people]
+    for masks, p in assignments(people, spec):
+        rest = (1 << len(totals)) - 1
+        for g, mask in enumerate(masks, 1):
+            rest &= ~mask
+            for i in bits(mask):
+                totals[i][g] += p
+        for i in bits(rest):
+            totals[i][0] += p
+
+    # Known traits are certain; others follow from the genes
+    for person, counts in zip(people, totals):
+        known = people[person]["trait"]
+        for label, g in model.index.items():
+            probabilities[person]["gene"][label] = counts[g]
+            if known is None:
+                probabilities[person]["trait"][True] += counts[g] * model.trait[g, 1]
+                probabilities[person]["trait"][False] += counts[g] * model.trait[g, 0]
+            else:
+                probabilities[person]["trait"][known] += counts[g]
+
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
+
+
+def batch_marginals(people, spec=None):
+    """
+    Return the gene and trait distribution of each person, computed
+    like `enumerate_marginals`, but evaluating assignments in batches.
+
+    Each assignment is a row of two integer matrices holding each
+    person's number of genes and trait (0 or 1); people whose trait is
+    known only take that value. Rows are decoded in `BATCH_SIZE` blocks
+    from a mixed-radix counter, their joint probabilities are computed
+    with `joint_probabilities`, and the marginals are accumulated with
+    one scatter-add per block.
+    """
+    model = tables(spec)
+    states = len(model)
+    names = list(people)
+    n = len(names)
+    unknown = [
+        i for i, name in enumerate(names) if people[name]["trait"] is None
+    ]
+    known = np.array([int(bool(people[name]["trait"])) for name in names])
+    digits = np.arange(len(unknown))
+
+    gene_totals = np.zeros((n, states))
+    trait_totals = np.zeros((n, 2))
+    columns = np.arange(n)
+    total = states ** n * 2 ** len(unknown)
+    for start in range(0, total, BATCH_SIZE):
+        rows = np.arange(start, min(start + BATCH_SIZE, total))
+
+        # The lowest digits are genes, one per state, the rest traits in base 2
+        genes = (rows[:, None] // states ** columns) % states
+        traits = np.tile(known, (len(rows), 1))
+        traits[:, unknown] = (rows[:, None] // states ** n // 2 ** digits) % 2
+
+        p = joint_probabilities(people, genes, traits, spec)
+        np.add.at(gene_totals, (columns, genes), p[:, None])
+        np.add.at(trait_totals, (columns, traits), p[:, None])
+
+    gene_totals /= gene_totals.sum(axis=1, keepdims=True)
+    trait_totals /= trait_totals.sum(axis=1, keepdims=True)
+    return {
+        name: {
+            "gene": {
+                label: float(gene_totals[i, g])
+                for label, g in model.index.items()
+            },
+            "trait": {t: float(trait_totals[i, int(t)]) for t in (True, False)}
+        }
+        for i, name in enumerate(names)
+    }
+
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
+def exact_marginals(people, spec=None):
+    """
+    Return the gene and trait distribution of each person, computed
+    exactly by junction tree inference over the family's Bayesian
+    network, without enumerating assignments.
+    """
+    genes = marginals(family_factors(people, spec))
+    return gene_probabilities(
+        people, [genes[person] for person in people], spec
+    )
+
+
+def gene_probabilities(people, genes, spec=None):
+    """
+    Return the gene and trait distribution of each person, given
+    `genes`, a sequence with each person's gene distribution as an array.
+    """
+    model = tables(spec)
+
+    probabilities = dict()
+    for person, gene in zip(people, genes):
+
+        # A person's trait only depends on their own genes
+        if people[person]["trait"] is None:
+            has_trait = float(gene @ model.trait[:, 1])
+        else:
+            has_trait = float(people[person]["trait"])
+
+        probabilities[person] = {
+            "gene": {label: float(gene[g]) for label, g in model.index.items()},
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+    return probabilities
+
+
+def likelihood_weighting(people, samples=SAMPLES, target_error=None,
+                         seed=None, spec=None):
+    """
+    Estimate the gene and trait distribution of each person by
+    likelihood weighting: genes are sampled parents first from the
+    model, and each sample is weighted by the probability of the
+    known traits given its genes.
+
+    Samples are drawn `SAMPLE_BATCH` at a time, up to `samples` in
+    total, stopping early once every estimate's standard error is
+    below `target_error`.
+
+    Return the distributions and a dictionary of diagnostics: the
+    number of samples, their effective sample size and the largest
+    standard error. Raise ValueError if `samples` is less than 1.
+    """
+    if samples < 1:
+        raise ValueError("likelihood weighting needs at least 1 sample")
+
+    model = tables(spec)
+    prior, inheritance, trait = model.prior, model.inheritance, model.trait
+    states = len(model)
+    rng = np.random.default_rng(seed)
+    names = list(people)
+    column = {name: i for i, name in enumerate(names)}
+    order = [column[name] for name in parents_first(people)]
+
+    # Running sums of weights, squared weights and weighted indicators
+    total = 0
+    squares = 0
+    counts = np.zeros((len(names), states))
+    count_squares = np.zeros((len(names), states))
+    drawn = 0
+    while drawn < samples:
+        size = min(SAMPLE_BATCH, samples - drawn)
+        genes = np.zeros((size, len(names)), dtype=np.int64)
+        weights = np.ones(size)
+        for i in order:
+            person = people[names[i]]
+            if person["mother"] is None and person["father"] is None:
+                distribution = np.broadcast_to(prior, (size, states))
+            else:
+                distribution = inheritance[
+                    genes[:, column[person["mother"]]],
+                    genes[:, column[person["father"]]]
+                ]
+            u = rng.random((size, 1))
+            genes[:, i] = (u > distribution.cumsum(axis=1)[:, :-1]).sum(axis=1)
+            if person["trait"] is not None:
+                weights *= trait[genes[:, i], int(person["trait"])]
+
+        indicators = genes[:, :, None] == np.arange(states)
+        total += weights.sum()
+        squares += (weights ** 2).sum()
+        counts += np.einsum("s,sig->ig", weights, indicators)
+        count_squares += np.einsum("s,sig->ig", weights ** 2, indicators)
+        drawn += size
+
+        # Standard error of each ratio estimate sum(w x) / sum(w)
+        estimate = counts / total
+        variance = (
+            count_squares - 2 * estimate * count_squares + estimate ** 2 * squares
         )
-        if fails_evidence:
-            continue
+        error = np.sqrt(np.maximum(variance, 0)) / total
+        if target_error is not None and error.max() < target_error:
+            break
+
+    diagnostics = {
+        "samples": drawn,
+        "effective samples": float(total ** 2 / squares),
+        "max standard error": float(error.max())
+    }
+    return gene_probabilities(people, estimate, spec), diagnostics
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+def gibbs_sampling(people, samples=SAMPLES, target_error=None, seed=None,
+                   spec=None):
+    """
+    Estimate the gene and trait distribution of each person by Gibbs
+    sampling, running `CHAINS` chains side by side. Each sweep resamples
+    every person's genes given their parents', their children's and
+    their own known trait. The first `BURN_IN` sweeps are discarded.
+
+    Each sweep adds the conditional distribution sampled from to the
+    estimates. Sweeping stops after `samples` samples across all
+    chains, or early once every estimate's standard error, judged from
+    the spread between chains, is below `target_error`.
+
+    Return the distributions and a dictionary of diagnostics: the
+    number of samples, the largest standard error and the largest
+    Gelman-Rubin statistic (close to 1 once the chains agree). At least
+    two sweeps are needed to compare the chains, so raise ValueError
+    if `samples` is not more than `CHAINS`.
+    """
+    if samples <= CHAINS:
+        raise ValueError(
+            f"Gibbs sampling needs at least {CHAINS + 1} samples, "
+            f"for two sweeps of {CHAINS} chains"
+        )
 
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+    model = tables(spec)
+    prior, inheritance, trait = model.prior, model.inheritance, model.trait
+    states = len(model)
+    rng = np.random.default_rng(seed)
+    names = list(people)
+    column = {name: i for i, name in enumerate(names)}
+
+    # Each person's children, as (child, other parent, is mother) triples
+    children = [[] for _ in names]
+    for name in names:
+        mother = people[name]["mother"]
+        father = people[name]["father"]
+        if mother is not None:
+            child = column[name]
+            children[column[mother]].append((child, column[father], True))
+            children[column[father]].append((child, column[mother], False))
+
+    def sweep(genes):
+        """
+        Resample each person's genes in turn, returning the
+        conditional distributions sampled from.
+        """
+        conditionals = np.zeros((CHAINS, len(names), states))
+        for i, name in enumerate(names):
+            person = people[name]
+            if person["mother"] is None and person["father"] is None:
+                p = np.tile(prior, (CHAINS, 1))
+            else:
+                p = inheritance[
+                    genes[:, column[person["mother"]]],
+                    genes[:, column[person["father"]]]
+                ].copy()
+            if person["trait"] is not None:
+                p *= trait[:, int(person["trait"])]
+            for child, other, is_mother in children[i]:
+                if is_mother:
+                    p *= inheritance[:, genes[:, other], genes[:, child]].T
+                else:
+                    p *= inheritance[genes[:, other], :, genes[:, child]]
+            p /= p.sum(axis=1, keepdims=True)
+            u = rng.random((CHAINS, 1))
+            genes[:, i] = (u > p.cumsum(axis=1)[:, :-1]).sum(axis=1)
+            conditionals[:, i] = p
+        return conditionals
+
+    genes = rng.choice(states, size=(CHAINS, len(names)), p=prior)
+    for _ in range(BURN_IN):
+        sweep(genes)
+
+    sums = np.zeros((CHAINS, len(names), states))
+    squares = np.zeros((CHAINS, len(names), states))
+    sweeps = 0
+    while sweeps * CHAINS < samples:
+        conditionals = sweep(genes)
+        sums += conditionals
+        squares += conditionals ** 2
+        sweeps += 1
+
+        if sweeps < 2:
+            continue
+        means = sums / sweeps
+        error = means.std(axis=0, ddof=1) / np.sqrt(CHAINS)
+        if target_error is not None and error.max() < target_error:
+            break
+
+    # Gelman-Rubin statistic from within- and between-chain variance
+    within = ((squares - sweeps * means ** 2) / (sweeps - 1)).mean(axis=0)
+    between = sweeps * means.var(axis=0, ddof=1)
+    pooled = (sweeps - 1) / sweeps * within + between / sweeps
+    mixed = within > 1e-12
+    rhat = np.sqrt(pooled[mixed] / within[mixed]).max() if mixed.any() else 1.0
+
+    diagnostics = {
+        "samples": sweeps * CHAINS,
+        "max standard error": float(error.max()),
+        "max R-hat": float(rhat)
+    }
+    return gene_probabilities(people, means.mean(axis=0), spec), diagnostics
 
-    # Print results
+
+def family_factors(people, spec=None):
+    """
+    Return the factors of the family's Bayesian network, with the
+    genes of each person as the variables, and each known trait
+    included as evidence about the person's genes.
+    """
+    model = tables(spec)
+    prior, inheritance, trait = model.prior, model.inheritance, model.trait
+    factors = []
     for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother is None and father is None:
+            factors.append(Factor([person], prior))
+        else:
+            factors.append(Factor([mother, father, person], inheritance))
+
+        if people[person]["trait"] is not None:
+            factors.append(Factor([person], trait[:, int(people[person]["trait"])]))
+    return factors
 
 
 def load_data(filename):
@@ -119,48 +512,116 @@ def load_data(filename):
 
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Yield every possible subset of set s, one at a time.
     """
     s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    for subset in itertools.chain.from_iterable(
+        itertools.combinations(s, r) for r in range(len(s) + 1)
+    ):
+        yield set(subset)
 
 
-def trait_conditional():
-    prob = []
-
-    keys = list(PROBS["trait"].keys())
+def parents_first(people):
+    """
+    Return the names in `people` ordered so that
+    everyone comes after their parents.
+    """
+    order = []
+    placed = set()
+
+    def place(person):
+        if person in placed:
+            return
+        placed.add(person)
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent is not None:
+                place(parent)
+        order.append(person)
 
-    for key in keys:
-        prob.append([key,True,PROBS["trait"][key][True]])
-        prob.append([key,False,PROBS["trait"][key][False]])
+    for person in people:
+        place(person)
+    return order
 
-    return prob
 
+def assignments(people, spec=None):
+    """
+    Lazily yield every assignment of genes to `people`, as a tuple
+    `(masks, p)`. `masks` holds a bitmask for each state of the
+    model's genes but the first, in which bit i is set if the ith
+    person in `people` is in that state; `p` is the joint probability
+    of those genes together with every known trait. With the default
+    model, the masks are of the people with one and two copies of the gene.
+
+    Known traits are fixed rather than enumerated, and unknown traits
+    are summed out, which leaves the probability of the genes unchanged.
+    People are assigned parents first, depth-first, so each partial
+    probability is shared by every assignment that extends it, and
+    branches with probability 0 are pruned.
+    """
+    model = tables(spec)
+    prior, inheritance, trait = model.prior, model.inheritance, model.trait
+    bit = {person: i for i, person in enumerate(people)}
+    order = parents_first(people)
+
+    def genes(masks, person):
+        i = bit[person]
+        for g, mask in enumerate(masks, 1):
+            if mask >> i & 1:
+                return g
+        return 0
+
+    stack = [(0, (0,) * (len(model) - 1), 1.0)]
+    while stack:
+        k, masks, p = stack.pop()
+        if k == len(order):
+            yield masks, p
+            continue
 
+        person = order[k]
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        for g in range(len(model)):
+            if mother is None and father is None:
+                q = p * prior[g]
+            else:
+                q = p * inheritance[
+                    genes(masks, mother), genes(masks, father), g
+                ]
+            if people[person]["trait"] is not None:
+                q *= trait[g, int(people[person]["trait"])]
+            if q == 0:
+                continue
+
+            extended = masks
+            if g > 0:
+                extended = (
+                    masks[:g - 1]
+                    + (masks[g - 1] | 1 << bit[person],)
+                    + masks[g:]
+                )
+            stack.append((k + 1, extended, q))
+
+
+def bits(mask):
+    """
+    Yield the position of each set bit of `mask`, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
 
-def child_conditional():
 
-    prob = []
- 
-    giving = [0.01,0.50,0.99] #calculated using PROBS["mutation"]
-    not_giving = [0.99,0.50,0.01]
+def tables(spec=None):
+    """
+    Return the `Model` compiled from `spec`, by default `PROBS`, whose
+    probability tables the inference methods use. Models are compiled
+    once per distinct spec and reused.
+    """
+    return compile_model(PROBS if spec is None else spec)
 
-    for i in range(3):
-        for j in range(3):
-            for k in range(3):
-                if k == 0:
-                    prob.append([i,j,k,not_giving[i]*not_giving[j]])
-                elif k == 2:
-                    prob.append([i,j,k,giving[i]*giving[j]])
-                else:
-                    prob.append([i,j,k,(giving[i]*not_giving[j] + not_giving[i]*giving[j])])
-    return prob
 
-def joint_probability(people, one_gene, two_genes, have_trait):
+def joint_probability(people, one_gene, two_genes, have_trait, spec=None):
     """
     Compute and return a joint probability.
 
@@ -172,67 +633,55 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone not in set` have_trait` does not have the trait.
     """
 
-    #create the conditional probablity table using discrete probablity table
-
-    trait_prob = trait_conditional()
-    child_prob = child_conditional()
-
-    # Create BayesianNetwork Model from people
-
-    model = BayesianNetwork()
-    persons = list(people.keys())
-    node = dict()
-    conditions = [] #list to store given conditions of the people
-
-    for person in persons:   #Adding Nodes representing people who do not have parents.
-        if people[person]['mother'] is None and people[person]['father'] is None:
-            node[person] = Node(DiscreteDistribution(PROBS["gene"]),name = person)
-            trait = person+"_Trait"
-            node[trait] = Node(ConditionalProbabilityTable(trait_prob,[node[person].distribution]),name = trait)
-            model.add_states(node[person],node[trait])
-            model.add_edge(node[person],node[trait])
+    model = tables(spec)
+    prior, inheritance, trait = model.prior, model.inheritance, model.trait
 
+    def genes(person):
+        if person in one_gene:
+            return model.index[1]
+        if person in two_genes:
+            return model.index[2]
+        return model.index[0]
 
-            if person in one_gene:
-                conditions.append(1)
-            elif person in two_genes:
-                conditions.append(2)
-            else:
-                conditions.append(0)
+    probability = 1
+    for person in people:
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        g = genes(person)
+        if mother is None and father is None:
+            probability *= prior[g]
+        else:
+            probability *= inheritance[genes(mother), genes(father), g]
+        probability *= trait[g, int(person in have_trait)]
 
-            if person in have_trait:
-                conditions.append(True)
-            else:
-                conditions.append(False)
-
-    for person in persons: #Adding Nodes representing people who do have parents.
-        if people[person]['mother'] and people[person]['father']:
-            node[person] = Node(ConditionalProbabilityTable(child_prob,[node[people[person]['father']].distribution,node[people[person]['mother']].distribution]),name = person)
-            trait = person+"_Trait"
-            node[trait] = Node(ConditionalProbabilityTable(trait_prob,[node[person].distribution]),name = trait)
-            model.add_states(node[person],node[trait])
-            model.add_edge(node[person],node[trait])
-            model.add_edge(node[people[person]['father']],node[person])
-            model.add_edge(node[people[person]['mother']],node[person])
-
-            
-            if person in one_gene:
-                conditions.append(1)
-            elif person in two_genes:
-                conditions.append(2)
-            else:
-                conditions.append(0)
+    return float(probability)
 
-            if person in have_trait:
-                conditions.append(True)
-            else:
-                conditions.append(False)
 
-    #calculate the probablity using the model
+def joint_probabilities(people, genes, traits, spec=None):
+    """
+    Compute the joint probability of many assignments at once.
 
-    model.bake()
-    probability = model.probability([conditions])
-    return probability
+    `genes` and `traits` are integer matrices with a row per assignment
+    and a column per person, in the order of `people`, holding each
+    person's state of genes in the model and trait (0 or 1). Return an
+    array with the joint probability of each row.
+    """
+    model = tables(spec)
+    prior, inheritance, trait = model.prior, model.inheritance, model.trait
+    column = {name: i for i, name in enumerate(people)}
+
+    p = np.ones(len(genes))
+    for name, i in column.items():
+        mother = people[name]["mother"]
+        father = people[name]["father"]
+        if mother is None and father is None:
+            p *= prior[genes[:, i]]
+        else:
+            p *= inheritance[
+                genes[:, column[mother]], genes[:, column[father]], genes[:, i]
+            ]
+        p *= trait[genes[:, i], traits[:, i]]
+    return p
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -269,10 +718,10 @@ def normalize(probabilities):
 
     for person in persons:
         s = 0
-        for i in range(3):
+        for i in probabilities[person]["gene"]:
             s = s + probabilities[person]["gene"][i]
 
-        for i in range(3):
+        for i in probabilities[person]["gene"]:
             probabilities[person]["gene"][i] = probabilities[person]["gene"][i]/s
 
 
@@ -285,5 +734,20 @@ def normalize(probabilities):
     return True
 
 
+# Ways of computing everyone's gene and trait distributions, by name
+METHODS = {
+    "exact": exact_marginals,
+    "batch": batch_marginals,
+    "enumerate": enumerate_marginals
+}
+
+# Ways of estimating the distributions by sampling, which also
+# return a dictionary of convergence diagnostics
+SAMPLERS = {
+    "likelihood": likelihood_weighting,
+    "gibbs": gibbs_sampling
+}
+
+
 if __name__ == "__main__":
     main()
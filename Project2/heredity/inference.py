@@ -0,0 +1,148 @@
+import functools
+
+import numpy as np
+
+
+class Factor():
+    """
+    Table of non-negative values over a tuple of discrete variables.
+    `table` has one axis per variable, in the order of `variables`.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = np.asarray(table, dtype=float)
+
+    def __mul__(self, other):
+        """
+        Return the product of two factors, over the union of their variables.
+        """
+        variables = tuple(dict.fromkeys(self.variables + other.variables))
+        labels = {variable: i for i, variable in enumerate(variables)}
+        table = np.einsum(
+            self.table, [labels[v] for v in self.variables],
+            other.table, [labels[v] for v in other.variables],
+            list(range(len(variables)))
+        )
+        return Factor(variables, table)
+
+    def marginal(self, keep):
+        """
+        Return the factor with every variable not in `keep` summed out,
+        rescaled so that its largest value is 1 to avoid underflow.
+        """
+        axes = tuple(
+            i for i, variable in enumerate(self.variables)
+            if variable not in keep
+        )
+        table = self.table.sum(axis=axes)
+        largest = table.max()
+        if largest > 0:
+            table = table / largest
+        return Factor(
+            [variable for variable in self.variables if variable in keep],
+            table
+        )
+
+
+def product(factors):
+    """
+    Return the product of a list of factors.
+    """
+    return functools.reduce(lambda a, b: a * b, factors, Factor([], 1))
+
+
+def elimination_order(factors):
+    """
+    Return an order in which to eliminate the variables of `factors`,
+    with the clique of each variable: itself and its neighbours at the
+    time it is eliminated.
+
+    The next variable is always the one whose elimination adds the
+    fewest new edges between its neighbours (the min-fill heuristic).
+    """
+    neighbours = dict()
+    for f in factors:
+        for variable in f.variables:
+            neighbours.setdefault(variable, set()).update(f.variables)
+    for variable in neighbours:
+        neighbours[variable].discard(variable)
+
+    def fill(variable):
+        around = list(neighbours[variable])
+        return sum(
+            1 for i, a in enumerate(around) for b in around[i + 1:]
+            if b not in neighbours[a]
+        )
+
+    order = []
+    cliques = dict()
+    while neighbours:
+        variable = min(
+            neighbours, key=lambda v: (fill(v), len(neighbours[v]))
+        )
+        around = neighbours.pop(variable)
+        for a in around:
+            neighbours[a].discard(variable)
+            neighbours[a].update(around - {a})
+        order.append(variable)
+        cliques[variable] = around | {variable}
+    return order, cliques
+
+
+def marginals(factors):
+    """
+    Return a dictionary mapping each variable of `factors` to its
+    normalised distribution under their product, as a 1D array.
+
+    The variables are eliminated in `elimination_order`, and the
+    cliques that creates are joined into a junction tree: each clique
+    hangs off the clique of its first neighbour to be eliminated later.
+    Messages are passed up the tree and then back down, after which
+    each clique holds the joint distribution of its variables.
+    """
+    order, cliques = elimination_order(factors)
+    position = {variable: i for i, variable in enumerate(order)}
+
+    parent = dict()
+    children = {variable: [] for variable in order}
+    for variable in order:
+        separator = cliques[variable] - {variable}
+        if separator:
+            parent[variable] = min(separator, key=position.get)
+            children[parent[variable]].append(variable)
+
+    # Each factor belongs to the clique of its first eliminated variable
+    home = {variable: [] for variable in order}
+    for f in factors:
+        if f.variables:
+            home[min(f.variables, key=position.get)].append(f)
+
+    # Pass messages up, from each clique to its parent
+    up = dict()
+    for variable in order:
+        if variable in parent:
+            incoming = home[variable] + [up[c] for c in children[variable]]
+            up[variable] = product(incoming).marginal(
+                cliques[variable] - {variable}
+            )
+
+    # Pass messages down, from each clique to its children
+    down = dict()
+    result = dict()
+    for variable in reversed(order):
+        incoming = home[variable]
+        if variable in parent:
+            incoming = incoming + [down[variable]]
+
+        belief = product(incoming + [up[c] for c in children[variable]])
+        table = belief.marginal({variable}).table
+        result[variable] = table / table.sum()
+
+        for child in children[variable]:
+            others = [up[c] for c in children[variable] if c != child]
+            down[child] = product(incoming + others).marginal(
+                cliques[child] - {child}
+            )
+
+    return result
@@ -0,0 +1,122 @@
+import hashlib
+
+import numpy as np
+
+# Compiled models, by the hash of the spec they were compiled from
+COMPILED = dict()
+
+
+class Model():
+    """
+    Probability tables of a gene and trait model, compiled from a spec
+    by `compile_model`.
+
+    Each person's genes are in one of `len(genotypes)` states, numbered
+    by their position in `genotypes`, which holds each state's pair of
+    alleles:
+        * `prior[g]`: probability that a person without parents is in state g
+        * `inheritance[m, f, c]`: probability that a child is in state c,
+          given that the mother is in state m and the father in state f
+        * `trait[g, t]`: probability of trait t (0 or 1) given state g
+    `index` maps the label of each genotype in the spec to its state,
+    in the order the spec lists them.
+    """
+
+    def __init__(self, genotypes, index, prior, inheritance, trait, digest):
+        self.genotypes = genotypes
+        self.index = index
+        self.prior = prior
+        self.inheritance = inheritance
+        self.trait = trait
+        self.digest = digest
+
+    def __len__(self):
+        return len(self.genotypes)
+
+
+def spec_hash(spec):
+    """
+    Return a hash of `spec` that changes whenever any of its values does.
+    """
+    return hashlib.sha256(repr(spec).encode()).hexdigest()
+
+
+def compile_model(spec):
+    """
+    Return the `Model` described by `spec`, a dictionary in the form of
+    `PROBS` in heredity.py, compiling it only the first time it is seen.
+
+    `spec` holds:
+        - "gene": the probability of each genotype in people without parents
+        - "trait": for each genotype, the probability of the trait
+          being True and False
+        - "mutation": the probability that an allele a parent passes on
+          mutates into one of the other alleles, each equally likely
+    It may also hold "alleles", a list of allele names, in which case
+    genotypes are labelled by their two alleles separated by a slash,
+    in either order, e.g. "A/B". Otherwise there are two alleles and
+    genotypes are labelled by their number of copies of the gene: 0, 1, 2.
+    """
+    digest = spec_hash(spec)
+    if digest not in COMPILED:
+        COMPILED[digest] = build(spec, digest)
+    return COMPILED[digest]
+
+
+def build(spec, digest):
+    """
+    Compile `spec` into a `Model`, raising ValueError if it is invalid.
+    """
+    names = spec.get("alleles")
+    alleles = 2 if names is None else len(names)
+    if alleles < 2:
+        raise ValueError("spec must have at least two alleles")
+    genotypes = [(a, b) for a in range(alleles) for b in range(a, alleles)]
+
+    def state(label):
+        if names is None:
+            if label not in (0, 1, 2):
+                raise ValueError(f"genotype {label!r} is not 0, 1 or 2")
+            return genotypes.index((int(label == 2), int(label > 0)))
+        pair = label.split("/")
+        if len(pair) != 2 or not set(pair) <= set(names):
+            raise ValueError(f"genotype {label!r} is not two alleles a/b")
+        return genotypes.index(tuple(sorted(names.index(a) for a in pair)))
+
+    index = {label: state(label) for label in spec["gene"]}
+    if sorted(index.values()) != list(range(len(genotypes))):
+        raise ValueError("spec must give each genotype's probability once")
+
+    prior = np.zeros(len(genotypes))
+    for label, g in index.items():
+        prior[g] = spec["gene"][label]
+
+    trait = np.zeros((len(genotypes), 2))
+    for label in spec["trait"]:
+        for t in (True, False):
+            trait[state(label), int(t)] = spec["trait"][label][t]
+
+    if not np.isclose(prior.sum(), 1) or not np.allclose(trait.sum(axis=1), 1):
+        raise ValueError("spec distributions must each sum to 1")
+
+    # Probability that each allele is passed on as each other allele
+    mutation = spec["mutation"]
+    if not 0 <= mutation <= 1:
+        raise ValueError("mutation probability must be between 0 and 1")
+    passed = np.full((alleles, alleles), mutation / (alleles - 1))
+    np.fill_diagonal(passed, 1 - mutation)
+
+    # Probability that a parent in each state passes on each allele,
+    # choosing either of their two alleles with equal probability
+    giving = np.array([(passed[a] + passed[b]) / 2 for a, b in genotypes])
+
+    # A child with alleles x and y got x from the mother and y from the
+    # father, or, if x and y differ, the other way round
+    x = np.array([a for a, b in genotypes])
+    y = np.array([b for a, b in genotypes])
+    inheritance = giving[:, None, x] * giving[None, :, y]
+    inheritance += np.where(
+        x != y, giving[:, None, y] * giving[None, :, x], 0
+    )
+
+    return Model(genotypes, index, prior, inheritance, trait, digest)
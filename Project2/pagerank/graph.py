@@ -0,0 +1,250 @@
+import os
+
+import numpy as np
+
+from functools import cached_property
+
+
+class Graph():
+    """
+    Link graph of a corpus, stored in compressed sparse row (CSR) form.
+
+    Pages are numbered by their position in `pages`. The pages linked
+    to by page `i` are `indices[indptr[i]:indptr[i + 1]]`.
+
+    A graph is saved as a directory holding the page names, one per
+    line, and the two arrays in NumPy's .npy format, which can be
+    memory-mapped when the graph is loaded again.
+    """
+
+    def __init__(self, pages, indptr, indices, ids=None):
+        self.pages = list(pages)
+        if ids is None:
+            ids = {page: i for i, page in enumerate(self.pages)}
+        self.ids = ids
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+
+        # Number of links on each page
+        self.outdegree = np.diff(self.indptr)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build the graph of a corpus as returned by `crawl`.
+        """
+        pages = sorted(corpus)
+        ids = {page: i for i, page in enumerate(pages)}
+        indptr = [0]
+        indices = []
+        for page in pages:
+            indices.extend(sorted(ids[link] for link in corpus[page]))
+            indptr.append(len(indices))
+        return cls(pages, indptr, indices)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a graph saved with `save`. If `mmap` is true, the link
+        arrays are memory-mapped rather than read into memory.
+        """
+        mode = "r" if mmap else None
+        with open(os.path.join(path, "pages.txt"), encoding="utf-8") as f:
+            pages = f.read().splitlines()
+        indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode=mode)
+        indices = np.load(os.path.join(path, "indices.npy"), mmap_mode=mode)
+        return cls(pages, indptr, indices)
+
+    @staticmethod
+    def saved(path):
+        """
+        Return True if `path` holds a graph saved with `save`.
+        """
+        return os.path.isfile(os.path.join(path, "indptr.npy"))
+
+    def save(self, path):
+        """
+        Save the graph to the directory `path`, creating it if needed.
+        """
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "pages.txt"), "w", encoding="utf-8") as f:
+            for page in self.pages:
+                f.write(page + "\n")
+        np.save(os.path.join(path, "indptr.npy"), self.indptr)
+        np.save(os.path.join(path, "indices.npy"), self.indices)
+
+    @cached_property
+    def sources(self):
+        """
+        Array holding the source page of each link.
+        """
+        return np.repeat(
+            np.arange(len(self.pages), dtype=np.int32), self.outdegree
+        )
+
+    def apply(self, diff):
+        """
+        Return a new graph with the changes in `diff` applied.
+
+        `diff` is a dictionary that may hold the keys:
+            - "added_pages" and "removed_pages": page names
+            - "added_links" and "removed_links": (page, page) pairs
+        Links to or from removed pages are removed with them.
+
+        Unless pages are removed, which renumbers them, the link arrays
+        are copied as they are, apart from the rows of pages whose links
+        changed, and new pages are numbered after the existing ones.
+        """
+        removed = set(diff.get("removed_pages", ()))
+        if not removed:
+            return self.extend(diff)
+
+        kept = [page for page in self.pages if page not in removed]
+        added = [
+            page for page in dict.fromkeys(diff.get("added_pages", ()))
+            if page not in self.ids or page in removed
+        ]
+        pages = kept + added
+        ids = {page: i for i, page in enumerate(pages)}
+        n = len(pages)
+
+        # Renumber the existing links, dropping those of removed pages
+        renumber = np.array(
+            [ids.get(page, -1) for page in self.pages], dtype=np.int64
+        )
+        sources = renumber[self.sources]
+        targets = renumber[self.indices]
+        keep = (sources >= 0) & (targets >= 0)
+        keys = sources[keep] * n + targets[keep]
+
+        # Each link is encoded as a single integer `source * n + target`
+        def encode(links):
+            pairs = [
+                (ids[a], ids[b]) for a, b in links
+                if a in ids and b in ids and a != b
+            ]
+            return np.array([a * n + b for a, b in pairs], dtype=np.int64)
+
+        keys = np.concatenate([keys, encode(diff.get("added_links", ()))])
+        keys = keys[~np.isin(keys, encode(diff.get("removed_links", ())))]
+        keys.sort()
+        keys = np.concatenate([keys[:1], keys[1:][keys[1:] != keys[:-1]]])
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // n, minlength=n), out=indptr[1:])
+        return Graph(pages, indptr, keys % n)
+
+    def extend(self, diff):
+        """
+        Return a new graph with the pages and links added and removed
+        by `diff`, which removes no pages, applied. See `apply`.
+        """
+        added = [
+            page for page in dict.fromkeys(diff.get("added_pages", ()))
+            if page not in self.ids
+        ]
+        ids = self.ids.copy()
+        for page in added:
+            ids[page] = len(ids)
+        n = len(ids)
+
+        # New links of each page whose links changed
+        rows = dict()
+        for links, adding in [
+            (diff.get("added_links", ()), True),
+            (diff.get("removed_links", ()), False)
+        ]:
+            for a, b in links:
+                if a not in ids or b not in ids or a == b:
+                    continue
+                source = ids[a]
+                if source not in rows:
+                    rows[source] = (
+                        set(self.links(source).tolist())
+                        if source < len(self) else set()
+                    )
+                if adding:
+                    rows[source].add(ids[b])
+                else:
+                    rows[source].discard(ids[b])
+
+        outdegree = np.zeros(n, dtype=np.int64)
+        outdegree[:len(self)] = self.outdegree
+        for source, targets in rows.items():
+            outdegree[source] = len(targets)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(outdegree, out=indptr[1:])
+
+        # Copy the unchanged rows between changed ones a block at a time
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        start = 0
+        for source in sorted(rows) + [n]:
+            end = min(source, len(self))
+            if start < end:
+                indices[indptr[start]:indptr[end]] = (
+                    self.indices[self.indptr[start]:self.indptr[end]]
+                )
+            if source < n:
+                indices[indptr[source]:indptr[source + 1]] = sorted(rows[source])
+            start = source + 1
+        return Graph(self.pages + added, indptr, indices, ids)
+
+    @cached_property
+    def inbound(self):
+        """
+        Pair `(indptr, sources)` of arrays holding the links grouped by
+        target page: the pages linking to page `i` are
+        `sources[indptr[i]:indptr[i + 1]]`.
+        """
+        order = np.argsort(self.indices, kind="stable")
+        indptr = np.zeros(len(self.pages) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(self.indices, minlength=len(self.pages)),
+            out=indptr[1:]
+        )
+        return indptr, self.sources[order]
+
+    def __len__(self):
+        return len(self.pages)
+
+    def links(self, i):
+        """
+        Return the array of pages linked to by page `i`.
+        """
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def links_from(self, pages):
+        """
+        Return the pages linked to by each page in the array `pages`,
+        one after another in a single array.
+        """
+        degree = self.outdegree[pages]
+        ends = np.cumsum(degree)
+        return self.indices[
+            np.repeat(self.indptr[pages] - ends + degree, degree)
+            + np.arange(ends[-1] if len(ends) else 0)
+        ]
+
+    def dangling(self):
+        """
+        Return a boolean array marking the pages with no links.
+        """
+        return self.outdegree == 0
+
+    def ranks(self, vector):
+        """
+        Return a dictionary mapping each page name to its value in `vector`.
+        """
+        return dict(zip(self.pages, np.asarray(vector).tolist()))
+
+
+def as_graph(corpus):
+    """
+    Return `corpus` as a `Graph`. It may be a dictionary as returned
+    by `crawl`, a `Graph`, or the path of a saved graph.
+    """
+    if isinstance(corpus, Graph):
+        return corpus
+    if isinstance(corpus, str):
+        return Graph.load(corpus)
+    return Graph.from_corpus(corpus)
@@ -1,35 +1,96 @@
 import os
+import posixpath
 import random
 import re
 import sys
+import time
 
-from pomegranate import *
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+import numpy as np
 import copy
 
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+from graph import Graph, as_graph
+
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Number of random surfers sampled side by side, and the fewest
+# pages each surfer visits, so that walks move away from their start
+SURFERS = 10000
+MIN_WALK = 100
+
+# Pattern matching the target of each link in an HTML page
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Characters read from a file at a time by `parallel_crawl`
+CHUNK_SIZE = 1 << 16
+
+# Longest link tag, in characters, that is still found when it is split
+# across two chunks; text after an unfinished tag is only kept this long
+MAX_TAG_LENGTH = 1 << 12
+
+# Solvers stop once the L1 residual of the ranks falls below this
+TOLERANCE = 1e-10
+
+# Incremental updates stop once the residual is this fraction of the
+# residual the change left at the previous PageRank values
+RELATIVE_TOLERANCE = 1e-2
+
+# Incremental updates push a change out from the edited pages while a
+# round follows fewer than this fraction of all links, then switch to
+# the solver
+PUSH_FRACTION = 0.1
+
+# Iterations between extrapolation steps of the accelerated solvers
+EXTRAPOLATION_PERIOD = 10
+
+# Forward push stops once no page holds more than this much
+# unpushed rank per link
+PUSH_EPSILON = 1e-7
+
+# Links read from disk at a time by `out_of_core_pagerank`
+BLOCK_EDGES = 1 << 22
+
 
 def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+
+    # A saved link graph is ranked without parsing any HTML
+    if Graph.saved(sys.argv[1]):
+        corpus, index = Graph.load(sys.argv[1]), None
+    else:
+        corpus, index = crawl(sys.argv[1], index=True)
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
-    print(f"PageRank Results from Iteration")
+    if index is not None:
+        ranks = iterate_pagerank(corpus, DAMPING, index)
+        print(f"PageRank Results from Iteration")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+    ranks = matrix_pagerank(corpus, DAMPING)
+    print(f"PageRank Results from Power Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, index=False, save=None):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    If `index` is true, return a pair `(corpus, link_index(corpus))`.
+    If `save` is given, also save the link graph to that path.
     """
     pages = dict()
 
@@ -39,7 +100,7 @@ def crawl(directory):
             continue
         with open(os.path.join(directory, filename)) as f:
             contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
+            links = LINK.findall(contents)
             pages[filename] = set(links) - {filename}
 
     # Only include links to other pages in the corpus
@@ -49,9 +110,116 @@ def crawl(directory):
             if link in pages
         )
 
+    if save is not None:
+        Graph.from_corpus(pages).save(save)
+
+    if index:
+        return pages, link_index(pages)
     return pages
 
 
+def parallel_crawl(directory, workers=None, chunk_size=CHUNK_SIZE, save=None):
+    """
+    Parse a directory of HTML pages like `crawl`, spreading the files
+    over a pool of `workers` processes, and return the link `Graph`.
+    If `save` is given, also save the graph to that path.
+
+    Files are read `chunk_size` characters at a time, and relative
+    links such as "./page.html#section" are normalised to file names.
+    """
+    filenames = sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    )
+    shards = (workers or os.cpu_count() or 1) * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            crawl_shard,
+            [directory] * shards,
+            [filenames[i::shards] for i in range(shards)],
+            [chunk_size] * shards
+        )
+
+        # Merge each shard's links, keeping only links to other pages
+        pages = set(filenames)
+        corpus = dict()
+        for shard in results:
+            for filename, links in shard.items():
+                corpus[filename] = (links & pages) - {filename}
+
+    graph = Graph.from_corpus(corpus)
+    if save is not None:
+        graph.save(save)
+    return graph
+
+
+def crawl_shard(directory, filenames, chunk_size):
+    """
+    Return a dictionary mapping each of `filenames` in `directory`
+    to the set of normalised links found in it.
+    """
+    return {
+        filename: set(
+            normalise_link(link)
+            for link in scan_links(os.path.join(directory, filename), chunk_size)
+        )
+        for filename in filenames
+    }
+
+
+def scan_links(path, chunk_size):
+    """
+    Yield the target of each link in the HTML file at `path`,
+    reading `chunk_size` characters at a time.
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        pending = ""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            text = pending + chunk
+            end = 0
+            for match in LINK.finditer(text):
+                yield match.group(1)
+                end = match.end()
+
+            # A link may be split across chunks, so carry over
+            # everything from the last tag opened after the last match,
+            # unless it is already too long to be a link tag
+            start = text.rfind("<", end)
+            if start != -1 and len(text) - start <= MAX_TAG_LENGTH:
+                pending = text[start:]
+            else:
+                pending = ""
+
+
+def normalise_link(link):
+    """
+    Return `link` as a path relative to the corpus directory,
+    without any query string or fragment.
+    """
+    link = link.split("#")[0].split("?")[0]
+    if not link:
+        return link
+    return posixpath.normpath(link)
+
+
+def link_index(corpus):
+    """
+    Return a pair `(inbound, outdegree)` of dictionaries, where
+    `inbound` maps each page to a list of the pages that link to it,
+    and `outdegree` maps each page to the number of links on it.
+    """
+    inbound = {page: [] for page in corpus}
+    outdegree = dict()
+    for page, links in corpus.items():
+        outdegree[page] = len(links)
+        for link in links:
+            inbound[link].append(page)
+    return inbound, outdegree
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -78,78 +246,45 @@ def transition_model(corpus, page, damping_factor):
     return distribution
 
 
-# def sample_pagerank(corpus, damping_factor, n):  #Using BayesianNetwork()
-    # pagerank = dict()
-    # pages = list(corpus.keys())
-
-    # for page in pages:
-    #     pagerank[page] = 0
-    # l = len(pages)
-    # curr_page = pages[random.randrange(l)]
-    # pagerank[curr_page] += 1
-
-    # for i in range(1,n):
-    #     trm = transition_model(corpus,curr_page,damping_factor)
-
-        # page = Node(DiscreteDistribution(trm), name="page")
-        # model = BayesianNetwork()
-        # model.add_states(page)
-        # model.bake()
-
-        # for state in model.states:
-        #     curr_page = state.distribution.sample()
-
-        # pagerank[curr_page] += 1
-
-
-    # for page in pages:
-    #     pagerank[page] = pagerank[page]/n
-    # return pagerank
-
-def sample_pagerank(corpus, damping_factor, n):  #Using MarkovChain()
-
-    pagerank = dict()
-    pages = list(corpus.keys())
-
-    start = dict()
-    table = []
-    for page in pages:
-        pagerank[page] = 0
-        start[page] = 1.0/len(pages)
-        trm = transition_model(corpus,page,damping_factor)
-        key = list(trm.keys())
-        for k in key:
-            table.append([page,k,trm[k]])
-
-    start = DiscreteDistribution(start)
-    transitions = ConditionalProbabilityTable(table,[start])
-    model = MarkovChain([start, transitions])
-
-    samples = model.sample(n)
-
-    for s in samples:
-        pagerank[s] += 1
-
-    for page in pages:
-        pagerank[page] = pagerank[page]/n
-
-    return pagerank
-
-
-def find_links(corpus,find):
-
-    l = []
-    pages = list(corpus.keys())
-
-    for page in pages:
-        if find in corpus[page]:
-            l.append(page)
-
-    return l
-
+def sample_pagerank(corpus, damping_factor, n, surfers=SURFERS):
+    """
+    Return PageRank values for each page by sampling `n` pages
+    according to transition model, starting with a page at random.
 
+    Rather than one long walk, up to `surfers` independent random
+    surfers walk side by side, each step advancing all of them at once.
 
-def iterate_pagerank(corpus, damping_factor):
+    `corpus` may be a dictionary as returned by `crawl`, a `Graph`,
+    or the path of a saved graph.
+    """
+    graph = as_graph(corpus)
+    rng = np.random.default_rng(random.getrandbits(64))
+    size = len(graph)
+
+    surfers = max(1, min(surfers, n // MIN_WALK))
+    counts = np.zeros(size, dtype=np.int64)
+    current = rng.integers(size, size=surfers)
+    remaining = n
+    while True:
+        counts += np.bincount(current[:remaining], minlength=size)
+        remaining -= len(current)
+        if remaining <= 0:
+            break
+
+        # Each surfer follows a random link with probability
+        # `damping_factor`, unless its page has no links
+        degree = graph.outdegree[current]
+        follow = (rng.random(len(current)) < damping_factor) & (degree > 0)
+        picks = (rng.random(len(current)) * degree).astype(np.int64)
+
+        new = rng.integers(size, size=len(current))
+        new[follow] = graph.indices[graph.indptr[current[follow]] + picks[follow]]
+        current = new
+
+    return graph.ranks(counts / n)
+
+
+def iterate_pagerank(corpus, damping_factor, index=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -157,9 +292,16 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    `index` is the pair returned by `link_index(corpus)`, which is
+    computed here if not given.
     """
     pagerank = dict()
     pages = list(corpus.keys())
+    if index is None:
+        index = link_index(corpus)
+    inbound, outdegree = index
+    dangling = [page for page in pages if outdegree[page] == 0]
 
     for page in pages:
         pagerank[page] = 1/len(pages)
@@ -168,13 +310,14 @@ def iterate_pagerank(corpus, damping_factor):
     flag = True
 
     while flag:
-        c = (1 - damping_factor)/len(pages)
+        # Pages without links share their rank with every page
+        d = sum(pagerank[page] for page in dangling)/len(pages)
+        c = (1 - damping_factor)/len(pages) + damping_factor*d
         flag = False
         for page in pages:
             s = 0
-            links = find_links(corpus,page)
-            for link in links:
-                s = s + pagerank[link]/len(corpus[link])
+            for link in inbound[page]:
+                s = s + pagerank[link]/outdegree[link]
 
             s = s * damping_factor
             updation = abs(pagerank[page] - c - s)
@@ -185,5 +328,448 @@ def iterate_pagerank(corpus, damping_factor):
     return pagerank
 
 
+def power_step(graph, rank, damping_factor, teleport=None):
+    """
+    Return the ranks after one step of the random surfer from `rank`.
+
+    The surfer jumps to a page drawn from the vector `teleport`,
+    or to any page uniformly if it is None. Pages without links are
+    treated as jumping in the same way.
+    """
+    n = len(graph)
+    linked = graph.outdegree > 0
+    share = np.zeros(n)
+    share[linked] = rank[linked] / graph.outdegree[linked]
+
+    new = np.bincount(graph.indices, weights=share[graph.sources], minlength=n)
+    new *= damping_factor
+    jump = 1 - damping_factor + damping_factor * rank[~linked].sum()
+    if teleport is None:
+        new += jump / n
+    else:
+        new += jump * teleport
+    return new
+
+
+def residual(graph, rank, damping_factor):
+    """
+    Return the L1 distance between `rank` and one step from it,
+    which is zero exactly when `rank` holds the PageRank values.
+    """
+    return np.abs(power_step(graph, rank, damping_factor) - rank).sum()
+
+
+def matrix_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                    solver="jacobi"):
+    """
+    Return PageRank values for each page by iterating over the sparse
+    link graph with the named solver from `SOLVERS`, stopping once
+    the L1 residual of the PageRank values is below `tolerance`.
+
+    `corpus` may be a dictionary as returned by `crawl`, a `Graph`,
+    or the path of a saved graph.
+    """
+    ranks, _ = solve_pagerank(corpus, damping_factor, tolerance, solver)
+    return ranks
+
+
+def solve_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                   solver="jacobi"):
+    """
+    Like `matrix_pagerank`, but also return a dictionary of statistics:
+    the solver, iterations taken, seconds spent and final residual.
+    """
+    graph = as_graph(corpus)
+    rank = np.full(len(graph), 1 / len(graph))
+
+    start = time.perf_counter()
+    rank, iterations = SOLVERS[solver](graph, rank, damping_factor, tolerance)
+    seconds = time.perf_counter() - start
+
+    stats = {
+        "solver": solver,
+        "iterations": iterations,
+        "seconds": seconds,
+        "residual": residual(graph, rank, damping_factor)
+    }
+    return graph.ranks(rank), stats
+
+
+def compare_solvers(corpus, damping_factor, tolerance=TOLERANCE):
+    """
+    Run every solver in `SOLVERS` on the corpus and print
+    how many iterations and how long each one took.
+    """
+    graph = as_graph(corpus)
+    for solver in SOLVERS:
+        _, stats = solve_pagerank(graph, damping_factor, tolerance, solver)
+        print(f"  {solver}: {stats['iterations']} iterations, "
+              f"{stats['seconds']:.3f}s, residual {stats['residual']:.2e}")
+
+
+def power_iterate(graph, rank, damping_factor, tolerance=TOLERANCE,
+                  teleport=None):
+    """
+    Run power iteration (the Jacobi method) from the rank vector `rank`
+    until the L1 residual is below `tolerance`. Return the final rank
+    vector and the number of iterations taken.
+
+    `teleport` is passed on to `power_step`.
+    """
+    iterations = 0
+    while True:
+        new = power_step(graph, rank, damping_factor, teleport)
+        iterations += 1
+        change = np.abs(new - rank).sum()
+        rank = new
+        if change < tolerance:
+            return rank, iterations
+
+
+def gauss_seidel(graph, rank, damping_factor, tolerance=TOLERANCE):
+    """
+    Run Gauss-Seidel iteration from the rank vector `rank` until the
+    L1 change made by a sweep is below `tolerance`. Each page is updated
+    in turn, using the values already updated in the same sweep.
+    Return the final rank vector and the number of sweeps taken.
+
+    A sweep is a sparse lower-triangular solve: with the links split
+    into those from earlier pages and those from later pages, the new
+    ranks solve (I - d * earlier) @ new = jump + d * later @ rank, where
+    rank jumping from pages without links is taken from the previous
+    sweep.
+    """
+    n = len(graph)
+    indptr, sources = graph.inbound
+    links = sparse.csr_matrix(
+        (damping_factor / graph.outdegree[sources], sources, indptr),
+        shape=(n, n)
+    )
+    later = sparse.triu(links, 1, format="csr")
+
+    # Factorising a triangular matrix without reordering or pivoting
+    # leaves it as it is, and gives a solver that can be reused
+    sweep = splu(
+        (sparse.identity(n) - sparse.tril(links, -1)).tocsc(),
+        permc_spec="NATURAL", diag_pivot_thresh=0
+    ).solve
+    dangling = graph.outdegree == 0
+
+    rank = rank / rank.sum()
+    iterations = 0
+    while True:
+        jump = 1 - damping_factor + damping_factor * rank[dangling].sum()
+        new = sweep(jump / n + later @ rank)
+        new /= new.sum()
+        iterations += 1
+        change = np.abs(new - rank).sum()
+        rank = new
+        if change < tolerance:
+            return rank, iterations
+
+
+def aitken(history):
+    """
+    Return the Aitken delta-squared extrapolation of the last three
+    rank vectors in `history`, applied to each page separately.
+    """
+    x0, x1, x2 = history[-3:]
+    second = x2 - 2 * x1 + x0
+    safe = np.abs(second) > 1e-15
+    result = x2.copy()
+    result[safe] -= (x2[safe] - x1[safe]) ** 2 / second[safe]
+    return result
+
+
+def quadratic(history):
+    """
+    Return the quadratic extrapolation of the last four rank vectors
+    in `history`, which assumes the error is dominated by the two
+    largest non-principal eigenvectors of the transition matrix.
+    """
+    x0, x1, x2, x3 = history[-4:]
+    y = np.column_stack([x1 - x0, x2 - x0])
+    gamma, *_ = np.linalg.lstsq(y, -(x3 - x0), rcond=None)
+    g1, g2, g3 = gamma[0], gamma[1], 1
+    return (g1 + g2 + g3) * x1 + (g2 + g3) * x2 + g3 * x3
+
+
+def extrapolated_solver(extrapolate, needed):
+    """
+    Return a solver that runs power iteration, replacing the ranks
+    every `EXTRAPOLATION_PERIOD` iterations with `extrapolate` applied
+    to the last `needed` rank vectors.
+    """
+    def solve(graph, rank, damping_factor, tolerance=TOLERANCE):
+        history = [rank]
+        iterations = 0
+        while True:
+            new = power_step(graph, rank, damping_factor)
+            iterations += 1
+            change = np.abs(new - rank).sum()
+            rank = new
+            if change < tolerance:
+                return rank, iterations
+
+            history = history[-(needed - 1):] + [rank]
+            if iterations % EXTRAPOLATION_PERIOD == 0 and len(history) == needed:
+                rank = np.clip(extrapolate(history), 0, None)
+                rank /= rank.sum()
+                history = [rank]
+    return solve
+
+
+# Solvers by name; each takes a graph, a starting rank vector, the
+# damping factor and a tolerance, and returns the final rank vector
+# with the number of iterations taken
+SOLVERS = {
+    "jacobi": power_iterate,
+    "gauss-seidel": gauss_seidel,
+    "aitken": extrapolated_solver(aitken, 3),
+    "quadratic": extrapolated_solver(quadratic, 4)
+}
+
+
+def incremental_pagerank(corpus, ranks, diff, damping_factor,
+                         tolerance=TOLERANCE, solver="jacobi",
+                         relative_tolerance=RELATIVE_TOLERANCE):
+    """
+    Update PageRank values after the corpus has changed.
+
+    `ranks` holds the PageRank values of the corpus before the change,
+    and `diff` describes the change, as accepted by `Graph.apply`.
+    The solver named by `solver` starts from the previous values and
+    stops once the residual is below `relative_tolerance` times the
+    residual the change left there, or below `tolerance` if that is
+    larger. The error of the update is then a small fraction of what
+    the change moved the ranks by, rather than an absolute amount,
+    so a small change takes only a few iterations; pass a
+    `relative_tolerance` of 0 to solve to `tolerance` instead.
+
+    Return the changed `Graph` and a dictionary of its PageRank values.
+    """
+    previous = as_graph(corpus)
+    graph = previous.apply(diff)
+
+    # When no pages were removed, old pages keep their positions, and
+    # the change can be pushed out from the pages whose links changed
+    old = len(previous)
+    if graph.pages[:old] == previous.pages:
+        # Values given in the order of the old graph (as `Graph.ranks`
+        # returns them) can be copied without looking each page up
+        if list(ranks) == previous.pages:
+            rank = np.fromiter(ranks.values(), float, old)
+        else:
+            rank = np.array([ranks.get(page, 1 / old) for page in previous.pages])
+        rank /= rank.sum()
+        changed = {
+            graph.ids[a]
+            for a, b in chain(diff.get("added_links", ()),
+                              diff.get("removed_links", ()))
+            if a in graph.ids
+        }
+        rank, start = push_change(
+            previous, graph, rank, changed, damping_factor,
+            PUSH_FRACTION * len(graph.indices)
+        )
+    else:
+        # New pages start with the rank of an average page
+        rank = np.array([ranks.get(page, 1 / len(graph)) for page in graph.pages])
+        rank /= rank.sum()
+        start = residual(graph, rank, damping_factor)
+
+    tolerance = max(tolerance, relative_tolerance * start)
+    rank, _ = SOLVERS[solver](graph, rank, damping_factor, tolerance)
+    return graph, graph.ranks(rank)
+
+
+def push_change(previous, graph, rank, changed, damping_factor, limit):
+    """
+    Start updating the PageRank values `rank` of the graph `previous`
+    for `graph`, which has the same pages followed by any new ones,
+    and differs in the links of the pages in `changed`.
+
+    Rather than stepping every page, the residual the change leaves is
+    found from the edited links and new pages alone, and pushed out
+    along links a round at a time: each round adds the residual to the
+    ranks and spreads it to the next pages, for as long as a round
+    follows no more than `limit` links. Residual reaching a page without
+    links, which would be spread over every page, is dropped, as a
+    residual equal on every page only rescales the ranks.
+
+    Return the normalised rank vector and the L1 size of the residual
+    the change left.
+    """
+    old, n = len(previous), len(graph)
+    jump = (1 - damping_factor
+            + damping_factor * rank[previous.outdegree == 0].sum())
+    rank = np.concatenate([rank, np.zeros(n - old)])
+
+    # Each edited page takes its share of rank from its old links and
+    # gives it to its new ones; new pages miss the jump share
+    targets = [np.arange(old, n)]
+    weights = [np.full(n - old, jump / old)]
+    for page in changed:
+        for version, sign in [(previous, -1), (graph, 1)]:
+            if page < len(version) and version.outdegree[page]:
+                links = version.links(page)
+                targets.append(links)
+                weights.append(np.full(
+                    len(links),
+                    sign * damping_factor * rank[page] / len(links)
+                ))
+    pages, inverse = np.unique(np.concatenate(targets), return_inverse=True)
+    unpushed = np.bincount(inverse, weights=np.concatenate(weights))
+    start = np.abs(unpushed).sum()
+
+    while len(pages):
+        degree = graph.outdegree[pages]
+        if degree.sum() > limit:
+            break
+        rank[pages] += unpushed
+        linked = degree > 0
+        share = damping_factor * unpushed[linked] / degree[linked]
+        pages, inverse = np.unique(
+            graph.links_from(pages[linked]), return_inverse=True
+        )
+        unpushed = np.bincount(inverse, weights=np.repeat(share, degree[linked]))
+
+    return rank / rank.sum(), start
+
+
+def personalized_pagerank(corpus, teleport, damping_factor,
+                          tolerance=TOLERANCE):
+    """
+    Return personalised PageRank values for each page, where the
+    random surfer jumps to pages in proportion to the weights in the
+    dictionary `teleport` instead of uniformly.
+
+    `corpus` may be a dictionary as returned by `crawl`, a `Graph`,
+    or the path of a saved graph.
+    """
+    graph = as_graph(corpus)
+    vector = np.zeros(len(graph))
+    for page, weight in teleport.items():
+        vector[graph.ids[page]] = weight
+    vector /= vector.sum()
+
+    rank, _ = power_iterate(graph, vector, damping_factor, tolerance, vector)
+    return graph.ranks(rank)
+
+
+def top_pages(corpus, seeds, k, damping_factor, epsilon=PUSH_EPSILON):
+    """
+    Return the `k` pages with the highest personalised PageRank for
+    `seeds`, as a list of (page, value) pairs from highest to lowest.
+
+    `seeds` is either a dictionary of teleport weights, as for
+    `personalized_pagerank`, or a collection of pages weighted equally.
+
+    Values are approximated by forward push, which only visits pages
+    near the seeds: each page's unpushed rank is kept until it exceeds
+    `epsilon` per link, and is then moved into the page's value and
+    spread along its links.
+    """
+    graph = as_graph(corpus)
+    if not isinstance(seeds, dict):
+        seeds = {page: 1 for page in seeds}
+    total = sum(seeds.values())
+    teleport = {graph.ids[page]: w / total for page, w in seeds.items()}
+
+    value = dict()
+    unpushed = dict(teleport)
+    queue = deque(unpushed)
+    queued = set(queue)
+    while queue:
+        page = queue.popleft()
+        queued.discard(page)
+        mass = unpushed.pop(page, 0)
+        value[page] = value.get(page, 0) + (1 - damping_factor) * mass
+
+        # Pages without links send the surfer back to the seeds
+        degree = int(graph.outdegree[page])
+        if degree:
+            targets = graph.links(page).tolist()
+            share = damping_factor * mass / degree
+            weights = [share] * degree
+        else:
+            targets = list(teleport)
+            weights = [damping_factor * mass * teleport[t] for t in targets]
+
+        for target, weight in zip(targets, weights):
+            unpushed[target] = unpushed.get(target, 0) + weight
+            limit = epsilon * max(int(graph.outdegree[target]), 1)
+            if target not in queued and unpushed[target] > limit:
+                queue.append(target)
+                queued.add(target)
+
+    best = sorted(value.items(), key=lambda item: item[1], reverse=True)
+    return [(graph.pages[page], score) for page, score in best[:k]]
+
+
+def out_of_core_pagerank(path, damping_factor, tolerance=TOLERANCE,
+                         block_edges=BLOCK_EDGES):
+    """
+    Return PageRank values for a graph saved with `Graph.save` at
+    `path`, by power iteration that never holds the links in memory.
+
+    Each iteration streams the memory-mapped link arrays in blocks of
+    about `block_edges` links; only the rank vectors stay in memory.
+
+    Return the PageRank values and a list with, for each iteration,
+    a dictionary of the bytes read, the seconds taken and the L1 change.
+    """
+    indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode="r")
+    indices = np.load(os.path.join(path, "indices.npy"), mmap_mode="r")
+    n = len(indptr) - 1
+
+    rank = np.full(n, 1 / n)
+    stats = []
+    while True:
+        start = time.perf_counter()
+        read = 0
+        new = np.zeros(n)
+        dangling = 0
+
+        first = 0
+        while first < n:
+            # Take whole pages until the block holds about `block_edges` links
+            last = int(np.searchsorted(
+                indptr, indptr[first] + block_edges, side="right"
+            )) - 1
+            last = min(max(last, first + 1), n)
+
+            offsets = np.asarray(indptr[first:last + 1])
+            targets = np.asarray(indices[offsets[0]:offsets[-1]])
+            read += offsets.nbytes + targets.nbytes
+
+            degree = np.diff(offsets)
+            block = rank[first:last]
+            dangling += block[degree == 0].sum()
+            share = np.zeros(len(block))
+            share[degree > 0] = block[degree > 0] / degree[degree > 0]
+
+            # Unlike np.bincount, this does not allocate a vector per block
+            np.add.at(new, targets, np.repeat(share, degree))
+            first = last
+
+        new *= damping_factor
+        new += (1 - damping_factor + damping_factor * dangling) / n
+        change = float(np.abs(new - rank).sum())
+        rank = new
+
+        stats.append({
+            "bytes": read,
+            "seconds": time.perf_counter() - start,
+            "change": change
+        })
+        if change < tolerance:
+            break
+
+    with open(os.path.join(path, "pages.txt"), encoding="utf-8") as f:
+        pages = f.read().splitlines()
+    return {page: float(rank[i]) for i, page in enumerate(pages)}, stats
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,86 @@
+import argparse
+import random
+import time
+
+from crossword import Crossword, bitset
+from generate import CrosswordCreator
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare search nodes with and without least "
+                    "constraining value ordering."
+    )
+    parser.add_argument("structure")
+    parser.add_argument("words")
+    parser.add_argument("-n", "--trials", type=int, default=20)
+    parser.add_argument("--fraction", type=float, default=0.95,
+                        help="fraction of the vocabulary used in each trial")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the first trial")
+    args = parser.parse_args()
+
+    if not 0 < args.fraction <= 1:
+        parser.error("fraction must be between 0 and 1")
+
+    crossword = Crossword(args.structure, args.words)
+    for lcv in (False, True):
+        results = [
+            solve(crossword, args.seed + n, args.fraction, lcv)
+            for n in range(args.trials)
+        ]
+        report("LCV" if lcv else "Vocabulary order", results)
+
+
+def solve(crossword, seed, fraction, lcv):
+    """
+    Solve `crossword` with a random `fraction` of its vocabulary, chosen
+    with `seed`, and return a dictionary with:
+        - `solved`: whether a solution was found
+        - `nodes`: how many calls to `backtrack` the search made
+        - `seconds`: how long the search took
+    """
+    rng = random.Random(seed)
+    words = len(crossword.vocabulary)
+    sample = bitset(rng.sample(range(words), round(words * fraction)))
+
+    creator = CrosswordCreator(crossword, lcv=lcv)
+    for var in creator.domains:
+        creator.domains[var] &= sample
+
+    start = time.perf_counter()
+    assignment = creator.solve()
+    return {
+        "solved": assignment is not None,
+        "nodes": creator.nodes,
+        "seconds": time.perf_counter() - start
+    }
+
+
+def report(label, results):
+    """
+    Print how many trials were solved, and the nodes and time they took.
+    Nodes are also given for solved trials alone, since a trial with no
+    solution searches the whole tree whatever order values are tried in.
+    """
+    solved = [result["nodes"] for result in results if result["solved"]]
+    seconds = sum(result["seconds"] for result in results)
+
+    print(f"{label}:")
+    print(f"  Solved: {len(solved)}/{len(results)}")
+    print(f"  Nodes: {summary([result['nodes'] for result in results])}")
+    if solved:
+        print(f"  Nodes when solved: {summary(solved)}")
+    print(f"  Time: {seconds:.3f}s")
+
+
+def summary(nodes):
+    """
+    Return the total, median and maximum of a list of node counts.
+    """
+    nodes = sorted(nodes)
+    return f"{sum(nodes)} total, {nodes[len(nodes) // 2]} median, {nodes[-1]} max"
+
+
+if __name__ == "__main__":
+    main()
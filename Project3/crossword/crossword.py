@@ -61,6 +61,26 @@ class Crossword():
         with open(words_file) as f:
             self.words = set(f.read().upper().splitlines())
 
+        # Number the words, shortest first, so that a set of words can be
+        # stored as a bitset: an int in which bit k stands for word k
+        self.vocabulary = sorted(self.words, key=lambda word: (len(word), word))
+        self.ids = {word: n for n, word in enumerate(self.vocabulary)}
+        self.alphabet = sorted(set(letter for word in self.words for letter in word))
+
+        # Index the words by length, and by the letter at each position:
+        # `index[length, k, letter]` holds the words of that length with
+        # that letter at position k
+        lengths = dict()
+        positions = dict()
+        for n, word in enumerate(self.vocabulary):
+            lengths.setdefault(len(word), []).append(n)
+            for k, letter in enumerate(word):
+                positions.setdefault((len(word), k, letter), []).append(n)
+        self.lengths = {
+            length: bitset(ids) for length, ids in lengths.items()
+        }
+        self.index = {key: bitset(ids) for key, ids in positions.items()}
+
         # Determine variable set
         self.variables = set()
         for i in range(self.height):
@@ -125,9 +145,31 @@ class Crossword():
                         cells2.index(intersection)
                     )
 
+        # Save the set of variables overlapping each variable
+        self.neighbours = {
+            var: frozenset(
+                v for v in self.variables
+                if v != var and self.overlaps[v, var]
+            )
+            for var in self.variables
+        }
+
+    def words_in(self, domain):
+        """Given a bitset of words, return the list of its words."""
+        bits = bin(domain)[:1:-1]
+        return [self.vocabulary[n] for n, bit in enumerate(bits) if bit == "1"]
+
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self.neighbours[var]
+
+
+def bitset(ids):
+    """Return the bitset with the bits numbered in `ids` set."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    bits = bytearray(max(ids) // 8 + 1)
+    for n in ids:
+        bits[n // 8] |= 1 << (n % 8)
+    return int.from_bytes(bits, "little")
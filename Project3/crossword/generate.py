@@ -1,21 +1,41 @@
 import sys
-import copy
+
+from collections import deque
 
 from crossword import *
 
 
 class CrosswordCreator():
 
-    def __init__(self, crossword):
+    def __init__(self, crossword, lcv=True):
         """
-        Create new CSP crossword generate.
+        Create new CSP crossword generate. If `lcv` is False, values
+        are tried in vocabulary order rather than least constraining first.
         """
         self.crossword = crossword
+        self.lcv = lcv
+
+        # Each domain is a bitset over `crossword.vocabulary`. Variables
+        # are kept in grid order, not set order, so that ties between
+        # them are broken the same way on every run
+        everything = (1 << len(self.crossword.vocabulary)) - 1
         self.domains = {
-            var: self.crossword.words.copy()
-            for var in self.crossword.variables
+            var: everything
+            for var in sorted(
+                self.crossword.variables,
+                key=lambda var: (var.i, var.j, var.direction)
+            )
         }
 
+        # Undo log of (variable, previous domain) pairs, one for each
+        # change made to a domain by `restrict`
+        self.trail = []
+
+        # Words used by the assignment being searched by `backtrack`,
+        # and the number of calls to it made by the last `solve`
+        self.used = set()
+        self.nodes = 0
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -92,6 +112,8 @@ class CrosswordCreator():
         """
         self.enforce_node_consistency()
         self.ac3()
+        self.used = set()
+        self.nodes = 0
         return self.backtrack(dict())
 
     def enforce_node_consistency(self):
@@ -102,11 +124,7 @@ class CrosswordCreator():
         """
         variables = list(self.domains.keys())
         for var in variables:
-            length = var.length
-            domain = list(self.domains[var])
-            for word in domain:
-                if len(word) != length:
-                    self.domains[var].remove(word)
+            self.domains[var] &= self.crossword.lengths.get(var.length, 0)
         return True
 
     def revise(self, x, y):
@@ -120,19 +138,40 @@ class CrosswordCreator():
         """
         revised = False
         if self.crossword.overlaps[x,y]:
-            i,j = self.crossword.overlaps[x,y][0],self.crossword.overlaps[x,y][1]
-            domain_x = list(self.domains[x])
-            domain_y = self.domains[y]
-            for word in domain_x:
-                flag = True
-                for w in domain_y:
-                    if w[j] == word[i]:
-                        flag = False
-                        break
-                if flag: 
-                    self.domains[x].remove(word)
+            i,j = self.crossword.overlaps[x,y]
+
+            # Keep the words of `x` with a letter at i that some word of
+            # `y` has at j
+            index = self.crossword.index
+            supported = 0
+            for letter in self.crossword.alphabet:
+                if self.domains[y] & index.get((y.length, j, letter), 0):
+                    supported |= index.get((x.length, i, letter), 0)
+            revised = self.restrict(x, supported)
         return revised
 
+    def restrict(self, var, words):
+        """
+        Remove from the domain of `var` every word not in the bitset
+        `words`, recording the previous domain on the trail.
+
+        Return True if any words were removed; return False otherwise.
+        """
+        domain = self.domains[var] & words
+        if domain == self.domains[var]:
+            return False
+        self.trail.append((var, self.domains[var]))
+        self.domains[var] = domain
+        return True
+
+    def undo(self, mark):
+        """
+        Restore the domains changed since the trail was `mark` entries long.
+        """
+        while len(self.trail) > mark:
+            var, domain = self.trail.pop()
+            self.domains[var] = domain
+
     def ac3(self, arcs=None):
         """
         Update `self.domains` such that each variable is arc consistent.
@@ -143,25 +182,27 @@ class CrosswordCreator():
         return False if one or more domains end up empty.
         """
         if arcs is None:
-            arcs = []
-            variables = list(self.domains.keys())
-            for var in variables:
-                neighbors = self.crossword.neighbors(var)
-                for neighbor in neighbors:
-                    if (var,neighbor) not in arcs and (neighbor,var) not in arcs:
-                        arcs.append((var,neighbor))
-
-        while len(arcs) > 0:
-            (x,y) = arcs[0]
-            arcs.pop(0)
+            arcs = [
+                (var, neighbor)
+                for var in self.domains
+                for neighbor in self.crossword.neighbors(var)
+            ]
+
+        # Queue of arcs to revise, with the set of arcs in it
+        queue = deque(dict.fromkeys(arcs))
+        queued = set(queue)
+        while queue:
+            (x,y) = queue.popleft()
+            queued.remove((x,y))
             if self.revise(x,y):
-                if len(self.domains[x]) == 0:
+                if not self.domains[x]:
                     return False
-                neighbors = self.crossword.neighbors(x)
-                neighbors.remove(y)
-                for neighbor in neighbors:
-                    if (x,neighbor) not in arcs and (neighbor,x) not in arcs:
-                        arcs.append((x,neighbor))
+
+                # Words supporting x's other neighbours may have gone
+                for neighbor in self.crossword.neighbors(x):
+                    if neighbor != y and (neighbor,x) not in queued:
+                        queue.append((neighbor,x))
+                        queued.add((neighbor,x))
         return True
 
     def assignment_complete(self, assignment):
@@ -197,6 +238,23 @@ class CrosswordCreator():
                             return False
         return True
 
+    def consistent_value(self, var, value, assignment):
+        """
+        Return True if assigning `value` to `var` keeps the consistent
+        `assignment` consistent; return False otherwise.
+
+        Only `var`'s assigned neighbours are checked, and `value` is
+        looked up in `self.used`, the words already in `assignment`.
+        """
+        if value in self.used or len(value) != var.length:
+            return False
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor in assignment:
+                (x,y) = self.crossword.overlaps[var,neighbor]
+                if value[x] != assignment[neighbor][y]:
+                    return False
+        return True
+
     def order_domain_values(self, var, assignment):
         """
         Return a list of values in the domain of `var`, in order by
@@ -204,25 +262,34 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        domain = list(self.domains[var])
-        cal = []
-        neighbors = self.crossword.neighbors(var)
-        for value in domain:
-            num = 0
-            for neighbor in neighbors:
-                if neighbor not in assignment:
-                    (x,y) = self.crossword.overlaps[var,neighbor]
-                    neighbor_domain = self.domains[neighbor]
-                    for word in neighbor_domain:
-                        if word[y] != value[x]:
-                            num += 1
-            cal.append((num,value))
-
-        cal.sort()
-        result = []
-        for c in cal:
-            result.append(c[1])
-        return domain #Basic Version
+        domain = self.crossword.words_in(self.domains[var])
+        if not self.lcv:
+            return domain
+
+        # For each unassigned neighbour, count the words in its domain
+        # with each letter at the cell it shares with `var`
+        index = self.crossword.index
+        histograms = []
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor not in assignment:
+                (x,y) = self.crossword.overlaps[var,neighbor]
+                neighbor_domain = self.domains[neighbor]
+                counts = {
+                    letter: (
+                        neighbor_domain
+                        & index.get((neighbor.length, y, letter), 0)
+                    ).bit_count()
+                    for letter in self.crossword.alphabet
+                }
+                histograms.append((x, neighbor_domain.bit_count(), counts))
+
+        # A value rules out the neighbours' words with another letter there
+        def ruled_out(value):
+            return sum(
+                size - counts[value[x]] for x, size, counts in histograms
+            )
+
+        return sorted(domain, key=ruled_out)
 
     def select_unassigned_variable(self, assignment):
         """
@@ -234,12 +301,12 @@ class CrosswordCreator():
         """
         ans = 0
         degree = 0
-        rem_value = 10000
+        rem_value = float("inf")
         variables = list(self.domains.keys())
         for var in variables:
             if not var in assignment:
                 d = len(list(self.crossword.neighbors(var)))
-                v = len(list(self.domains[var]))
+                v = self.domains[var].bit_count()
                 if (v < rem_value) or (v == rem_value and d > degree):
                     rem_value = v
                     degree = d
@@ -252,28 +319,38 @@ class CrosswordCreator():
         crossword and return a complete assignment if possible to do so.
 
         `assignment` is a mapping from variables (keys) to words (values).
+        It is extended in place, and left as it was if no assignment is found.
+
+        Arc consistency is maintained during the search: after each
+        value is assigned, the domain of its variable is cut down to
+        that value and the change is propagated with `ac3`. Domain
+        changes are recorded on the trail and undone when the value is.
 
         If no assignment is possible, return None.
         """
+        self.nodes += 1
         if self.assignment_complete(assignment):
             return assignment
         var = self.select_unassigned_variable(assignment)
         values = self.order_domain_values(var,assignment)
         for value in values:
-            new_assignment = copy.deepcopy(assignment)
-            new_assignment[var] = value
-            if self.consistent(new_assignment):
-                arcs = []    # ensuring arc consistency 
-                neighbors = self.crossword.neighbors(var)
-                for neighbor in neighbors:
-                    if (var,neighbor) not in arcs and (neighbor,var) not in arcs:
-                        arcs.append((var,neighbor))
-                inf = self.ac3(arcs)
-                if inf == False:
-                    return None
-                result = self.backtrack(new_assignment)
-                if result is not None:
-                    return result
+            if self.consistent_value(var, value, assignment):
+                assignment[var] = value
+                self.used.add(value)
+                mark = len(self.trail)
+                self.restrict(var, 1 << self.crossword.ids[value])
+                arcs = [
+                    (neighbor, var)
+                    for neighbor in self.crossword.neighbors(var)
+                    if neighbor not in assignment
+                ]
+                if self.ac3(arcs):
+                    result = self.backtrack(assignment)
+                    if result is not None:
+                        return result
+                self.undo(mark)
+                self.used.remove(value)
+                del assignment[var]
         return None
 
 